@@ -7,6 +7,7 @@ import rasterio
 import rasterio.warp
 import srtm4
 
+from rpcm import file_cache
 from rpcm import rpc_model
 from rpcm import utils
 from rpcm.rpc_model import RPCModel
@@ -33,6 +34,78 @@ class NoSRTMWarning(Warning):
     pass
 
 
+def _apply_crop_transform(C, x, y):
+    """
+    Apply a crop transformation matrix to image coordinates.
+
+    Args:
+        C (np.array): 3x3 crop transformation matrix
+        x, y (float or list): image coordinate(s) of the input point(s)
+
+    Returns:
+        transformed x, y image coordinate(s)
+    """
+    if not (np.isscalar(x) and np.isscalar(y)):
+        x = np.asarray(x)
+        y = np.asarray(y)
+
+    # writing out the rows of C avoids building homogeneous coordinates
+    x1 = C[0, 0] * x + C[0, 1] * y + C[0, 2]
+    y1 = C[1, 0] * x + C[1, 1] * y + C[1, 2]
+
+    # crop transforms are affine, with last row (0, 0, 1), and need no
+    # normalization. Other matrices are normalized by the homogeneous coordinate
+    if C[2, 0] != 0 or C[2, 1] != 0 or C[2, 2] != 1:
+        w = C[2, 0] * x + C[2, 1] * y + C[2, 2]
+        x1 = x1 / w
+        y1 = y1 / w
+    return x1, y1
+
+
+def _coerce_points(*arrays):
+    """
+    Check that coordinates have compatible shapes and convert them to float64
+    numpy arrays, once, before any expensive work is done.
+
+    Args:
+        *arrays: floats, lists or numpy arrays of coordinates. None values
+            (i.e. missing altitudes) are passed through.
+
+    Returns:
+        list: the input coordinates, converted to contiguous float64 arrays
+            unless they are all scalars
+
+    Raises:
+        ValueError: if the shapes of the coordinates are not compatible
+    """
+    np.broadcast_shapes(*[np.shape(a) for a in arrays if a is not None])
+    if all(a is None or np.isscalar(a) for a in arrays):
+        return list(arrays)
+    # unlike np.ascontiguousarray, np.asarray keeps the shape of 0-d arrays
+    return [a if a is None else np.asarray(a, dtype=np.float64, order='C')
+            for a in arrays]
+
+
+@file_cache.cached_by_file_version(maxsize=128)
+def _load_crop_transform(crop_path):
+    """
+    Read the crop transformation matrix stored in the header of a crop
+    produced by rpcm, and compute its inverse. Results are cached, so that
+    the crop file header is read only once, unless it is modified.
+
+    Args:
+        crop_path (str): path or url to an image crop produced by rpcm
+
+    Returns:
+        C, C_inv (np.arrays): 3x3 crop transformation matrix and its inverse
+    """
+    with rasterio.open(crop_path, 'r') as src:
+        tags = src.tags()
+
+    C = np.fromstring(tags['CROP_TRANSFORM'], sep=' ').reshape(3, 3)
+    return C, np.linalg.inv(C)
+
+
 def projection(img_path, lon, lat, z=None, crop_path=None, svg_path=None,
                verbose=False):
     """
@@ -52,6 +125,8 @@ def projection(img_path, lon, lat, z=None, crop_path=None, svg_path=None,
         float or list: x pixel coordinate(s) of the projected point(s)
         float or list: y pixel coordinate(s) of the projected point(s)
     """
+    lon, lat, z = _coerce_points(lon, lat, z)
+
     rpc = rpc_from_geotiff(img_path)
     if z is None:
         z = srtm4.srtm4(lon, lat)
@@ -59,13 +134,8 @@ def projection(img_path, lon, lat, z=None, crop_path=None, svg_path=None,
     x, y = rpc.projection(lon, lat, z)
 
     if crop_path:  # load and apply crop transformation matrix
-        with rasterio.open(crop_path, 'r') as src:
-            tags = src.tags()
-
-        C = list(map(float, tags['CROP_TRANSFORM'].split()))
-        C = np.array(C).reshape(3, 3)
-        h = np.row_stack((x, y, x**0))  # homogeneous coordinates
-        x, y = np.dot(C, h).squeeze()[:2]
+        C, _ = _load_crop_transform(crop_path)
+        x, y = _apply_crop_transform(C, x, y)
 
     if svg_path:  #TODO
         pass
@@ -93,14 +163,11 @@ def localization(img_path, x, y, z, crop_path=None, verbose=False):
         float or list: longitude(s) of the localised point(s)
         float or list: latitude(s) of the localised point(s)
     """
-    if crop_path:  # load and apply crop transformation matrix
-        with rasterio.open(crop_path, 'r') as src:
-            tags = src.tags()
+    x, y, z = _coerce_points(x, y, z)
 
-        C = list(map(float, tags['CROP_TRANSFORM'].split()))
-        C = np.array(C).reshape(3, 3)
-        h = np.row_stack((x, y, x**0))  # homogeneous coordinates
-        x, y = np.dot(np.linalg.inv(C), h).squeeze()[:2]
+    if crop_path:  # load and apply inverse crop transformation matrix
+        _, C_inv = _load_crop_transform(crop_path)
+        x, y = _apply_crop_transform(C_inv, x, y)
 
     rpc = rpc_from_geotiff(img_path)
     lon, lat = rpc.localization(x, y, z)
@@ -143,17 +210,20 @@ def crop(output_crop_path, input_geotiff_path, aoi, z=None):
     utils.rasterio_write(output_crop_path, crop, tags=tags)
 
 
-def image_footprint(geotiff_path, z=None, verbose=False):
+@file_cache.cached_by_file_version(maxsize=512)
+def _read_image_header(geotiff_path):
     """
-    Compute the longitude, latitude footprint of an image using its RPC model.
+    Read the RPC model, shape, bounds and CRS of a GeoTIFF file. Results are
+    cached, so that the header is fetched and the RPC coefficients are parsed
+    only once per file.
 
     Args:
         geotiff_path (str): path or url to a GeoTIFF file
-        z (float): altitude (in meters above the WGS84 ellipsoid) used to
-            convert the image corners pixel coordinates into longitude, latitude
 
     Returns:
-        geojson.Feature object containing the image footprint polygon
+        rpc (rpc_model.RPCModel or None): RPC model, if the file has RPC tags
+        h, w (ints): height and width of the image
+        bounds, crs: georeferencing of the image (in case of ortho image)
     """
     with rasterio.open(geotiff_path, 'r') as src:
         rpc_dict = src.tags(ns='RPC')
@@ -162,8 +232,25 @@ def image_footprint(geotiff_path, z=None, verbose=False):
         bounds = src.bounds  # in case of georeferenced ortho image
         crs = src.crs
 
-    if rpc_dict:
-        rpc = rpc_model.RPCModel(rpc_dict)
+    rpc = rpc_model.RPCModel(rpc_dict) if rpc_dict else None
+    return rpc, h, w, bounds, crs
+
+
+def image_footprint(geotiff_path, z=None, verbose=False):
+    """
+    Compute the longitude, latitude footprint of an image using its RPC model.
+
+    Args:
+        geotiff_path (str): path or url to a GeoTIFF file
+        z (float): altitude (in meters above the WGS84 ellipsoid) used to
+            convert the image corners pixel coordinates into longitude, latitude
+
+    Returns:
+        geojson.Feature object containing the image footprint polygon
+    """
+    rpc, h, w, bounds, crs = _read_image_header(geotiff_path)
+
+    if rpc is not None:
         if z is None:
             z = srtm4.srtm4(rpc.lon_offset, rpc.lat_offset)
             if np.isnan(z):
@@ -201,11 +288,11 @@ def angle_between_views(geotiff_path_1, geotiff_path_2, lon=None, lat=None,
     Args:
         geotiff_path_1 (str): path or url to a GeoTIFF file
         geotiff_path_2 (str): path or url to a GeoTIFF file
-        lon, lat, z (floats): longitude, latitude, altitude of the 3D point
-            where to compute the angle
+        lon, lat, z (floats or lists): longitude(s), latitude(s), altitude(s)
+            of the 3D point(s) where to compute the angle
 
     Returns:
-        float: angle between the views, in degrees
+        float or array: angle(s) between the views, in degrees
     """
     rpc1 = rpc_from_geotiff(geotiff_path_1)
     rpc2 = rpc_from_geotiff(geotiff_path_2)
@@ -219,9 +306,10 @@ def angle_between_views(geotiff_path_1, geotiff_path_2, lon=None, lat=None,
 
     a = utils.viewing_direction(*rpc1.incidence_angles(lon, lat, z))
     b = utils.viewing_direction(*rpc2.incidence_angles(lon, lat, z))
-    angle = np.degrees(np.arccos(np.dot(a, b)))
+    angle = np.degrees(np.arccos(np.einsum('i...,i...->...', a, b)))
 
     if verbose:
-        print('{:.3f}'.format(angle))
+        for x in np.atleast_1d(angle):
+            print('{:.3f}'.format(x))
 
     return angle
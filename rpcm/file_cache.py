@@ -0,0 +1,64 @@
+import functools
+import os
+
+
+def file_version(path):
+    """
+    Identify the current version of a file, for use in cache keys, so that
+    cached values are invalidated when a local file is modified.
+
+    Args:
+        path: path or url to a file, or any other input accepted by
+            rasterio.open (such as an open file object)
+
+    Returns:
+        (mtime_ns, size) tuple of ints for a local file, (None, None) for a
+        url or a remote file, which are assumed not to change, or None if
+        the input is not a path, in which case nothing should be cached
+    """
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:  # url, or path to a remote file
+        return None, None
+    return st.st_mtime_ns, st.st_size
+
+
+def cached_by_file_version(maxsize=128):
+    """
+    Decorator caching the results of a function whose only argument is a
+    path or url to a file. Local files are identified by their absolute
+    path, so that a relative path doesn't hit the results of another file
+    after a change of working directory, and by their version, given by
+    file_version, so that a modified file is read again. Urls and remote
+    files are identified by their path, and assumed not to change. Inputs
+    that are not paths, such as open file objects, are not cached.
+
+    Args:
+        maxsize (int): maximum number of cached results
+
+    Returns:
+        decorator. The decorated function has the cache_info and cache_clear
+        methods of functools.lru_cache. Its results are shared between calls,
+        hence must not be modified.
+    """
+    def decorator(read):
+        @functools.lru_cache(maxsize=maxsize)
+        def cached_read(path, version):
+            return read(path)
+
+        @functools.wraps(read)
+        def wrapper(path):
+            version = file_version(path)
+            if version is None:
+                return read(path)
+            if version != (None, None):  # local file
+                path = os.path.abspath(path)
+            return cached_read(path, version)
+
+        wrapper.cache_info = cached_read.cache_info
+        wrapper.cache_clear = cached_read.cache_clear
+        return wrapper
+
+    return decorator
@@ -1,21 +1,54 @@
+import functools
+
+import numpy as np
+import pyproj
+
+
 def compute_epsg(lon, lat):
     """
     Compute the EPSG code of the UTM zone which contains
     the point with given longitude and latitude
 
     Args:
-        lon (float): longitude of the point
-        lat (float): latitude of the point
+        lon (float or array): longitude(s) of the point(s)
+        lat (float or array): latitude(s) of the point(s)
 
     Returns:
-        int: EPSG code
+        int or array of ints: EPSG code(s)
+
+    Raises:
+        ValueError: if a longitude or latitude is not finite
     """
+    lon = np.asarray(lon)
+    lat = np.asarray(lat)
+    if not (np.all(np.isfinite(lon)) and np.all(np.isfinite(lat))):
+        raise ValueError("longitudes and latitudes must be finite")
+
     # UTM zone number starts from 1 at longitude -180,
-    # and increments by 1 every 6 degrees of longitude
-    zone = int((lon + 180) // 6 + 1)
+    # and increments by 1 every 6 degrees of longitude.
+    # Longitude 180 is the eastern edge of zone 60
+    zone = np.minimum((lon + 180) // 6 + 1, 60)
 
     # EPSG = CONST + ZONE where CONST is
     # - 32600 for positive latitudes
     # - 32700 for negative latitudes
-    const = 32600 if lat > 0 else 32700
-    return const + zone
+    const = np.where(lat > 0, 32600, 32700)
+    epsg = (const + zone).astype(int)
+
+    # plain int for a single point, as expected by pyproj
+    return int(epsg) if epsg.ndim == 0 else epsg
+
+
+@functools.lru_cache(maxsize=64)
+def lonlat_to_epsg_transformer(epsg):
+    """
+    Return a transformer from longitude, latitude to the given coordinate
+    reference system. Transformers are cached, as creating one is costly.
+
+    Args:
+        epsg (int): EPSG code of the output coordinate reference system
+
+    Returns:
+        pyproj.Transformer object, with longitude, latitude input order
+    """
+    return pyproj.Transformer.from_crs(4326, epsg, always_xy=True)
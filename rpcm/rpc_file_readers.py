@@ -3,8 +3,16 @@
 # Copyright (C) 2015-19, Enric Meinhardt <enric.meinhardt@cmla.ens-cachan.fr>
 
 
+import os
 from xml.etree import ElementTree
 
+from rpcm import file_cache
+
+
+# ascii characters removed from the keys of ikonos files: all but [a-zA-Z0-9_]
+_IKONOS_KEY_DELETED_CHARS = bytes(c for c in range(128)
+                                 if not (chr(c).isalnum() or chr(c) == '_'))
+
 
 def read_rpc_file(rpc_file):
     """
@@ -12,6 +20,9 @@ def read_rpc_file(rpc_file):
       xml          : spot6, pleiades, worldview
       txt (others) : ikonos
 
+    Each file is parsed only once: subsequent calls on the same path reuse
+    the parsed content, unless the file was modified in the meantime.
+
     Args:
         rpc_file: RPC sidecar file path
 
@@ -19,20 +30,37 @@ def read_rpc_file(rpc_file):
         dictionary read from the RPC file, or an empty dict if fail
 
     """
+    # the cached dict is shared, hence copied. Its values are immutable
+    # (strings and floats) so a shallow copy is enough
+    return dict(_read_rpc_file(rpc_file))
 
-    with open(rpc_file) as f:
-        rpc_content = f.read()
 
-    if rpc_file.lower().endswith('xml'):
-        try:
-            rpc = read_rpc_xml(rpc_content)
-        except NotImplementedError:
-            raise NotImplementedError('XML file {} not supported'.format(rpc_file))
-    else:
-        # we assume that non xml rpc files follow the ikonos convention
-        rpc = read_rpc_ikonos(rpc_content)
+@file_cache.cached_by_file_version(maxsize=256)
+def _read_rpc_file(rpc_file):
+    """
+    Cached implementation of read_rpc_file.
+
+    Args:
+        rpc_file (str): path to the RPC sidecar file
+
+    Returns:
+        dictionary read from the RPC file. Must not be modified.
+    """
+    # the file is read in binary mode: the XML parser decodes it according to
+    # its prolog, and the ikonos parser does not need newline translation
+    with open(rpc_file, 'rb') as f:
+        rpc_content = f.read()
 
-    return rpc
+    ext = os.path.splitext(rpc_file)[1].lower()
+    reader = RPC_FILE_READERS.get(ext)
+    if reader is None:
+        # we assume that rpc files with other extensions follow the ikonos convention
+        return read_rpc_ikonos(rpc_content)
+    try:
+        return reader(rpc_content)
+    except NotImplementedError:
+        raise NotImplementedError('{} file {} not supported'.format(ext[1:].upper(),
+                                                                   rpc_file))
 
 
 def read_rpc_ikonos(rpc_content):
@@ -40,38 +68,56 @@ def read_rpc_ikonos(rpc_content):
     Read RPC file assuming the ikonos format
 
     Args:
-        rpc_content: content of RPC sidecar file path read as a string
+        rpc_content: content of RPC sidecar file path read as a string or as
+            bytes (decoded as UTF-8)
 
     Returns:
         dictionary read from the RPC file
 
     """
-    import re
-
-    lines = rpc_content.split('\n')
+    if isinstance(rpc_content, bytes):
+        rpc_content = rpc_content.decode('utf-8', errors='replace')
+    # splitlines handles \n, \r\n and \r line endings, as the universal
+    # newlines mode of text files does
+    lines = rpc_content.splitlines()
+
+    # the 20 coefficients of each polynom are written on separate lines, with
+    # keys PREFIX_1 to PREFIX_20. They are routed to one list per polynom
+    coeffs = {prefix: [None] * 20 for prefix in ['SAMP_NUM_COEFF', 'SAMP_DEN_COEFF',
+                                                 'LINE_NUM_COEFF', 'LINE_DEN_COEFF',
+                                                 'LON_NUM_COEFF', 'LON_DEN_COEFF',
+                                                 'LAT_NUM_COEFF', 'LAT_DEN_COEFF']}
 
     d = {}
     for l in lines:
         ll = l.split()
         if len(ll) > 1:
-            k = re.sub(r"[^a-zA-Z0-9_]","",ll[0])
-            d[k] = ll[1]
-
-    def parse_coeff(dic, prefix, indices):
+            # keep only [a-zA-Z0-9_]: non-ascii characters are dropped by the
+            # encoding, the others by the translation
+            k = ll[0].encode('ascii', 'ignore').translate(None, _IKONOS_KEY_DELETED_CHARS).decode()
+            prefix, _, index = k.rpartition('_')
+            if prefix in coeffs and index.isdigit() and 1 <= int(index) <= 20:
+                coeffs[prefix][int(index) - 1] = ll[1]
+            else:
+                d[k] = ll[1]
+
+    def parse_coeff(prefix):
         """ helper function"""
-        return ' '.join([dic["%s_%s" % (prefix, str(x))] for x in indices])
+        if None in coeffs[prefix]:
+            raise KeyError("%s_%d" % (prefix, coeffs[prefix].index(None) + 1))
+        return ' '.join(coeffs[prefix])
 
-    d['SAMP_NUM_COEFF']  = parse_coeff(d, "SAMP_NUM_COEFF", range(1, 21))
-    d['SAMP_DEN_COEFF']  = parse_coeff(d, "SAMP_DEN_COEFF", range(1, 21))
-    d['LINE_NUM_COEFF']  = parse_coeff(d, "LINE_NUM_COEFF", range(1, 21))
-    d['LINE_DEN_COEFF']  = parse_coeff(d, "LINE_DEN_COEFF", range(1, 21))
+    d['SAMP_NUM_COEFF']  = parse_coeff("SAMP_NUM_COEFF")
+    d['SAMP_DEN_COEFF']  = parse_coeff("SAMP_DEN_COEFF")
+    d['LINE_NUM_COEFF']  = parse_coeff("LINE_NUM_COEFF")
+    d['LINE_DEN_COEFF']  = parse_coeff("LINE_DEN_COEFF")
 
     # if the LON/LAT coefficients are present then it must be an "extended ikonos"
-    if 'LON_NUM_COEFF_1' in d:
-        d['LON_NUM_COEFF']  = parse_coeff(d, "LON_NUM_COEFF", range(1, 21))
-        d['LON_DEN_COEFF']  = parse_coeff(d, "LON_DEN_COEFF", range(1, 21))
-        d['LAT_NUM_COEFF']   = parse_coeff(d, "LAT_NUM_COEFF" , range(1, 21))
-        d['LAT_DEN_COEFF']   = parse_coeff(d, "LAT_DEN_COEFF" , range(1, 21))
+    if coeffs['LON_NUM_COEFF'][0] is not None:
+        d['LON_NUM_COEFF']  = parse_coeff("LON_NUM_COEFF")
+        d['LON_DEN_COEFF']  = parse_coeff("LON_DEN_COEFF")
+        d['LAT_NUM_COEFF']   = parse_coeff("LAT_NUM_COEFF")
+        d['LAT_DEN_COEFF']   = parse_coeff("LAT_DEN_COEFF")
 
     return d
 
@@ -82,7 +128,8 @@ def read_rpc_xml(rpc_content):
     Read RPC file assuming the XML format and determine whether it's a pleiades, spot-6 or worldview image
 
     Args:
-        rpc_content: content of RPC sidecar file path read as a string (XML format)
+        rpc_content: content of RPC sidecar file path read as a string or as
+            bytes (XML format)
 
     Returns:
         dictionary read from the RPC file
@@ -95,18 +142,20 @@ def read_rpc_xml(rpc_content):
     # parse the xml file content
     tree = ElementTree.fromstring(rpc_content)
 
-    # determine wether it's a pleiades, spot-6 or worldview image
-    a = tree.find('Metadata_Identification/METADATA_PROFILE') # PHR_SENSOR
-    b = tree.find('IMD/IMAGE/SATID') # WorldView
+    # determine wether it's a pleiades, spot-6 or worldview image. WorldView
+    # documents have an 'isd' root element, for which the (missing) DIMAP
+    # profile isn't searched
+    a = None
+    if tree.tag != 'isd':
+        a = tree.find('Metadata_Identification/METADATA_PROFILE') # PHR_SENSOR
     parsed_rpc = None
     if a is not None:
-        if a.text in ['PHR_SENSOR', 'S6_SENSOR', 'S7_SENSOR']:
-            parsed_rpc = read_rpc_xml_pleiades(tree)
-        elif a.text in ['PNEO_SENSOR']:
-            parsed_rpc = read_rpc_xml_pleiades_neo(tree)
-    elif b is not None:
-        if b.text == 'WV02' or b.text == 'WV01' or b.text == 'WV03':
-            parsed_rpc = read_rpc_xml_worldview(tree)
+        reader = DIMAP_READERS.get(a.text)
+    else:
+        b = tree.find('IMD/IMAGE/SATID') # WorldView
+        reader = WORLDVIEW_READERS.get(b.text) if b is not None else None
+    if reader is not None:
+        parsed_rpc = reader(tree)
 
     if not parsed_rpc:
         raise NotImplementedError()
@@ -114,6 +163,64 @@ def read_rpc_xml(rpc_content):
     return parsed_rpc
 
 
+def children_texts(element):
+    """
+    Map the tag of each child of an XML element to its text, in a single pass.
+
+    Args:
+        element: parsed XML element
+
+    Returns:
+        dictionary mapping tags to texts
+    """
+    return {child.tag: child.text for child in element}
+
+
+def children_by_tag(element):
+    """
+    Map the tag of each child of an XML element to the child, in a single pass.
+
+    Args:
+        element: parsed XML element
+
+    Returns:
+        dictionary mapping tags to child elements
+    """
+    return {child.tag: child for child in element}
+
+
+# XML tags of the scale and offset fields, for each family of XML files
+DIMAP_SCALE_OFFSET_TAGS = {
+    'LINE_OFF': 'LINE_OFF', 'SAMP_OFF': 'SAMP_OFF', 'LAT_OFF': 'LAT_OFF',
+    'LONG_OFF': 'LONG_OFF', 'HEIGHT_OFF': 'HEIGHT_OFF',
+    'LINE_SCALE': 'LINE_SCALE', 'SAMP_SCALE': 'SAMP_SCALE', 'LAT_SCALE': 'LAT_SCALE',
+    'LONG_SCALE': 'LONG_SCALE', 'HEIGHT_SCALE': 'HEIGHT_SCALE',
+}
+WORLDVIEW_SCALE_OFFSET_TAGS = {
+    'LINE_OFF': 'LINEOFFSET', 'SAMP_OFF': 'SAMPOFFSET', 'LAT_OFF': 'LATOFFSET',
+    'LONG_OFF': 'LONGOFFSET', 'HEIGHT_OFF': 'HEIGHTOFFSET',
+    'LINE_SCALE': 'LINESCALE', 'SAMP_SCALE': 'SAMPSCALE', 'LAT_SCALE': 'LATSCALE',
+    'LONG_SCALE': 'LONGSCALE', 'HEIGHT_SCALE': 'HEIGHTSCALE',
+}
+
+
+def parse_scales_and_offsets(children, tags):
+    """
+    Read the scale and offset fields of an RPC model from the children of an
+    XML element.
+
+    Args:
+        children: dictionary mapping the tags of the children of the XML
+            element to the children, as given by children_by_tag
+        tags: dictionary mapping the RPC keys to the XML tags of the fields,
+            such as DIMAP_SCALE_OFFSET_TAGS
+
+    Returns:
+        dictionary mapping the RPC keys to floats
+    """
+    return {key: float(children[tag].text) for key, tag in tags.items()}
+
+
 def read_rpc_xml_pleiades(tree):
     """
     Read RPC fields from a parsed XML tree assuming the pleiades, spot-6 XML format
@@ -128,12 +235,12 @@ def read_rpc_xml_pleiades(tree):
     """
     m = {}
 
-    def parse_coeff(element, prefix, indices):
+    def parse_coeff(texts, prefix, indices):
         """ helper function"""
-        return ' '.join([element.find("%s_%s" % (prefix, str(x))).text for x in indices])
+        return ' '.join([texts["%s_%s" % (prefix, str(x))] for x in indices])
 
     # direct model (LOCALIZATION)
-    d = tree.find('Rational_Function_Model/Global_RFM/Direct_Model')
+    d = children_texts(tree.find('Rational_Function_Model/Global_RFM/Direct_Model'))
     m['LON_NUM_COEFF'] = parse_coeff(d, "SAMP_NUM_COEFF", range(1, 21))
     m['LON_DEN_COEFF'] = parse_coeff(d, "SAMP_DEN_COEFF", range(1, 21))
     m['LAT_NUM_COEFF'] = parse_coeff(d, "LINE_NUM_COEFF", range(1, 21))
@@ -142,7 +249,7 @@ def read_rpc_xml_pleiades(tree):
 
 
     ## inverse model (PROJECTION)
-    i = tree.find('Rational_Function_Model/Global_RFM/Inverse_Model')
+    i = children_texts(tree.find('Rational_Function_Model/Global_RFM/Inverse_Model'))
     m['SAMP_NUM_COEFF']  = parse_coeff(i, "SAMP_NUM_COEFF", range(1, 21))
     m['SAMP_DEN_COEFF']  = parse_coeff(i, "SAMP_DEN_COEFF", range(1, 21))
     m['LINE_NUM_COEFF']  = parse_coeff(i, "LINE_NUM_COEFF", range(1, 21))
@@ -167,16 +274,9 @@ def read_rpc_xml_pleiades(tree):
     # the -1 in line and column offsets is due to Pleiades RPC convention
     # that states that the top-left pixel of an image has coordinates
     # (1, 1)
-    m['LINE_OFF'    ] = float(v.find('LINE_OFF').text) - 1
-    m['SAMP_OFF'    ] = float(v.find('SAMP_OFF').text) - 1
-    m['LAT_OFF'     ] = float(v.find('LAT_OFF').text)
-    m['LONG_OFF'    ] = float(v.find('LONG_OFF').text)
-    m['HEIGHT_OFF'  ] = float(v.find('HEIGHT_OFF').text)
-    m['LINE_SCALE'  ] = float(v.find('LINE_SCALE').text)
-    m['SAMP_SCALE'  ] = float(v.find('SAMP_SCALE').text)
-    m['LAT_SCALE'   ] = float(v.find('LAT_SCALE').text)
-    m['LONG_SCALE'  ] = float(v.find('LONG_SCALE').text)
-    m['HEIGHT_SCALE'] = float(v.find('HEIGHT_SCALE').text)
+    m.update(parse_scales_and_offsets(children_by_tag(v), DIMAP_SCALE_OFFSET_TAGS))
+    m['LINE_OFF'] -= 1
+    m['SAMP_OFF'] -= 1
 
     return m
 
@@ -192,12 +292,12 @@ def read_rpc_xml_pleiades_neo(tree):
     """
     m = {}
 
-    def parse_coeff(element, prefix, indices):
+    def parse_coeff(texts, prefix, indices):
         """ helper function"""
-        return ' '.join([element.find("%s_%s" % (prefix, str(x))).text for x in indices])
+        return ' '.join([texts["%s_%s" % (prefix, str(x))] for x in indices])
 
     # direct model (LOCALIZATION)
-    d = tree.find('Rational_Function_Model/Global_RFM/ImagetoGround_Values')
+    d = children_texts(tree.find('Rational_Function_Model/Global_RFM/ImagetoGround_Values'))
     m['LON_NUM_COEFF'] = parse_coeff(d, "LON_NUM_COEFF", range(1, 21))
     m['LON_DEN_COEFF'] = parse_coeff(d, "LON_DEN_COEFF", range(1, 21))
     m['LAT_NUM_COEFF'] = parse_coeff(d, "LAT_NUM_COEFF", range(1, 21))
@@ -206,7 +306,7 @@ def read_rpc_xml_pleiades_neo(tree):
 
 
     ## inverse model (PROJECTION)
-    i = tree.find('Rational_Function_Model/Global_RFM/GroundtoImage_Values')
+    i = children_texts(tree.find('Rational_Function_Model/Global_RFM/GroundtoImage_Values'))
     m['SAMP_NUM_COEFF']  = parse_coeff(i, "SAMP_NUM_COEFF", range(1, 21))
     m['SAMP_DEN_COEFF']  = parse_coeff(i, "SAMP_DEN_COEFF", range(1, 21))
     m['LINE_NUM_COEFF']  = parse_coeff(i, "LINE_NUM_COEFF", range(1, 21))
@@ -228,16 +328,7 @@ def read_rpc_xml_pleiades_neo(tree):
     #m.lastLat  = float(vi.find('LAST_LAT').text)
 
     # scale and offset
-    m['LINE_OFF'    ] = float(v.find('LINE_OFF').text)
-    m['SAMP_OFF'    ] = float(v.find('SAMP_OFF').text)
-    m['LAT_OFF'     ] = float(v.find('LAT_OFF').text)
-    m['LONG_OFF'    ] = float(v.find('LONG_OFF').text)
-    m['HEIGHT_OFF'  ] = float(v.find('HEIGHT_OFF').text)
-    m['LINE_SCALE'  ] = float(v.find('LINE_SCALE').text)
-    m['SAMP_SCALE'  ] = float(v.find('SAMP_SCALE').text)
-    m['LAT_SCALE'   ] = float(v.find('LAT_SCALE').text)
-    m['LONG_SCALE'  ] = float(v.find('LONG_SCALE').text)
-    m['HEIGHT_SCALE'] = float(v.find('HEIGHT_SCALE').text)
+    m.update(parse_scales_and_offsets(children_by_tag(v), DIMAP_SCALE_OFFSET_TAGS))
 
     return m
 
@@ -256,33 +347,38 @@ def read_rpc_xml_worldview(tree):
     m = {}
 
     # inverse model (PROJECTION)
-    im = tree.find('RPB/IMAGE')
-    l = im.find('LINENUMCOEFList/LINENUMCOEF')
-    m['LINE_NUM_COEFF'] =  l.text
-    l = im.find('LINEDENCOEFList/LINEDENCOEF')
-    m['LINE_DEN_COEFF'] =  l.text
-    l = im.find('SAMPNUMCOEFList/SAMPNUMCOEF')
-    m['SAMP_NUM_COEFF'] =  l.text
-    l = im.find('SAMPDENCOEFList/SAMPDENCOEF')
-    m['SAMP_DEN_COEFF'] =  l.text
-    m['ERR_BIAS'] = float(im.find('ERRBIAS').text)
+    # the children of the IMAGE element are collected in a single pass, and
+    # used for both the coefficients and the scales and offsets
+    im = children_by_tag(tree.find('RPB/IMAGE'))
+    m['LINE_NUM_COEFF'] = im['LINENUMCOEFList'].find('LINENUMCOEF').text
+    m['LINE_DEN_COEFF'] = im['LINEDENCOEFList'].find('LINEDENCOEF').text
+    m['SAMP_NUM_COEFF'] = im['SAMPNUMCOEFList'].find('SAMPNUMCOEF').text
+    m['SAMP_DEN_COEFF'] = im['SAMPDENCOEFList'].find('SAMPDENCOEF').text
+    m['ERR_BIAS'] = float(im['ERRBIAS'].text)
 
     # scale and offset
-    m['LINE_OFF'    ] = float(im.find('LINEOFFSET').text)
-    m['SAMP_OFF'    ] = float(im.find('SAMPOFFSET').text)
-    m['LAT_OFF'     ] = float(im.find('LATOFFSET').text)
-    m['LONG_OFF'    ] = float(im.find('LONGOFFSET').text)
-    m['HEIGHT_OFF'  ] = float(im.find('HEIGHTOFFSET').text)
-
-    m['LINE_SCALE'  ] = float(im.find('LINESCALE').text)
-    m['SAMP_SCALE'  ] = float(im.find('SAMPSCALE').text)
-    m['LAT_SCALE'   ] = float(im.find('LATSCALE').text)
-    m['LONG_SCALE'  ] = float(im.find('LONGSCALE').text)
-    m['HEIGHT_SCALE'] = float(im.find('HEIGHTSCALE').text)
-
+    m.update(parse_scales_and_offsets(im, WORLDVIEW_SCALE_OFFSET_TAGS))
 
 #    # image dimensions
 #    m.lastRow = int(tree.find('IMD/NUMROWS').text)
 #    m.lastCol = int(tree.find('IMD/NUMCOLUMNS').text)
 
     return m
+
+
+# readers of the supported XML formats, indexed by DIMAP metadata profile and
+# by WorldView satellite identifier
+DIMAP_READERS = {
+    'PHR_SENSOR': read_rpc_xml_pleiades,
+    'S6_SENSOR': read_rpc_xml_pleiades,
+    'S7_SENSOR': read_rpc_xml_pleiades,
+    'PNEO_SENSOR': read_rpc_xml_pleiades_neo,
+}
+
+WORLDVIEW_READERS = dict.fromkeys(['WV01', 'WV02', 'WV03'], read_rpc_xml_worldview)
+
+# readers of the RPC sidecar files, indexed by lowercase file extension. Files
+# with other extensions are read with read_rpc_ikonos
+RPC_FILE_READERS = {
+    '.xml': read_rpc_xml,
+}
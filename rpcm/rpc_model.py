@@ -6,9 +6,9 @@ Copyright (C) 2015-19, Enric Meinhardt <enric.meinhardt@cmla.ens-cachan.fr>
 """
 
 import numpy as np
-import pyproj
 import rasterio
 
+from rpcm import file_cache
 from rpcm import geo
 from rpcm.rpc_file_readers import read_rpc_file
 
@@ -32,20 +32,171 @@ def apply_poly(poly, x, y, z):
     Returns:
         the value(s) of the polynom on the input point(s).
     """
-    out = 0
-    out += poly[0]
-    out += poly[1]*y + poly[2]*x + poly[3]*z
-    out += poly[4]*y*x + poly[5]*y*z +poly[6]*x*z
-    out += poly[7]*y*y + poly[8]*x*x + poly[9]*z*z
-    out += poly[10]*x*y*z
-    out += poly[11]*y*y*y
-    out += poly[12]*y*x*x + poly[13]*y*z*z + poly[14]*y*y*x
-    out += poly[15]*x*x*x
-    out += poly[16]*x*z*z + poly[17]*y*y*z + poly[18]*x*x*z
-    out += poly[19]*z*z*z
+    # the polynom is factored as a Horner scheme in z, whose coefficients are
+    # polynoms in x and y sharing the products xx, yy and xy
+    xx = x*x
+    yy = y*y
+    xy = x*y
+
+    p0 = (poly[0] + poly[1]*y + poly[2]*x + poly[4]*xy + poly[7]*yy + poly[8]*xx
+          + poly[11]*yy*y + poly[12]*y*xx + poly[14]*yy*x + poly[15]*xx*x)
+    p1 = poly[3] + poly[5]*y + poly[6]*x + poly[10]*xy + poly[17]*yy + poly[18]*xx
+    p2 = poly[9] + poly[13]*y + poly[16]*x
+    p3 = poly[19]
+
+    out = p0 + z*(p1 + z*(p2 + z*p3))
     return out
 
 
+def monomials(x, y, z):
+    """
+    Computes the 20 monomials of a 3-variables polynom of degree 3.
+
+    Args:
+        x, y, z: triplet of floats. They may be numpy arrays of same shape.
+
+    Returns:
+        numpy array of shape (20,) + shape of the inputs, containing the
+        monomials ordered following the RPC convention. The value(s) of a
+        polynom are given by np.tensordot(poly, monomials(x, y, z), axes=1).
+    """
+    x, y, z = np.broadcast_arrays(x, y, z)
+    xx = x*x
+    yy = y*y
+    zz = z*z
+    xy = x*y
+
+    m = np.empty((20,) + x.shape)
+    m[0] = 1
+    m[1] = y
+    m[2] = x
+    m[3] = z
+    m[4] = xy
+    m[5] = y*z
+    m[6] = x*z
+    m[7] = yy
+    m[8] = xx
+    m[9] = zz
+    m[10] = xy*z
+    m[11] = yy*y
+    m[12] = y*xx
+    m[13] = y*zz
+    m[14] = yy*x
+    m[15] = xx*x
+    m[16] = x*zz
+    m[17] = yy*z
+    m[18] = xx*z
+    m[19] = zz*z
+    return m
+
+
+def monomials_gradient(x, y, z):
+    """
+    Computes the partial derivatives of the 20 monomials of a 3-variables
+    polynom of degree 3.
+
+    Args:
+        x, y, z: triplet of floats. They may be numpy arrays of same shape.
+
+    Returns:
+        numpy array of shape (3, 20) + shape of the inputs, containing the
+        derivatives of the monomials with respect to x, y and z, ordered
+        following the RPC convention.
+    """
+    x, y, z = np.broadcast_arrays(x, y, z)
+    g = np.zeros((3, 20) + x.shape)
+
+    # derivatives with respect to x
+    g[0, 2] = 1
+    g[0, 4] = y
+    g[0, 6] = z
+    g[0, 8] = 2*x
+    g[0, 10] = y*z
+    g[0, 12] = 2*x*y
+    g[0, 14] = y*y
+    g[0, 15] = 3*x*x
+    g[0, 16] = z*z
+    g[0, 18] = 2*x*z
+
+    # derivatives with respect to y
+    g[1, 1] = 1
+    g[1, 4] = x
+    g[1, 5] = z
+    g[1, 7] = 2*y
+    g[1, 10] = x*z
+    g[1, 11] = 3*y*y
+    g[1, 12] = x*x
+    g[1, 13] = z*z
+    g[1, 14] = 2*x*y
+    g[1, 17] = 2*y*z
+
+    # derivatives with respect to z
+    g[2, 3] = 1
+    g[2, 5] = y
+    g[2, 6] = x
+    g[2, 9] = 2*z
+    g[2, 10] = x*y
+    g[2, 13] = 2*y*z
+    g[2, 16] = 2*x*z
+    g[2, 17] = y*y
+    g[2, 18] = x*x
+    g[2, 19] = 3*z*z
+    return g
+
+
+def monomials_xy(x, y):
+    """
+    Computes the 10 monomials of a 2-variables polynom of degree 3.
+
+    Args:
+        x, y: pair of floats. They may be numpy arrays of same shape.
+
+    Returns:
+        numpy array of shape (10,) + shape of the inputs, containing the
+        monomials 1, y, x, xy, yy, xx, yyy, yxx, yyx, xxx, ie the RPC
+        monomials without z, in the same order.
+    """
+    x, y = np.broadcast_arrays(x, y)
+    xx = x*x
+    yy = y*y
+
+    m = np.empty((10,) + x.shape)
+    m[0] = 1
+    m[1] = y
+    m[2] = x
+    m[3] = x*y
+    m[4] = yy
+    m[5] = xx
+    m[6] = yy*y
+    m[7] = y*xx
+    m[8] = yy*x
+    m[9] = xx*x
+    return m
+
+
+def restrict_to_altitude(polys, z):
+    """
+    Restricts 3-variables polynoms of degree 3 to a plane of constant z.
+
+    Args:
+        polys: array of shape (..., 20) of polynom coefficients, ordered
+            following the RPC convention
+        z (float): value of the third variable
+
+    Returns:
+        array of shape (..., 10) of the coefficients of the resulting
+        2-variables polynoms, in the order of monomials_xy.
+    """
+    p = np.moveaxis(np.asarray(polys, dtype=float), -1, 0)
+    return np.stack([p[0] + z*(p[3] + z*(p[9] + z*p[19])),
+                     p[1] + z*(p[5] + z*p[13]),
+                     p[2] + z*(p[6] + z*p[16]),
+                     p[4] + z*p[10],
+                     p[7] + z*p[17],
+                     p[8] + z*p[18],
+                     p[11], p[12], p[14], p[15]], axis=-1)
+
+
 def apply_rfm(num, den, x, y, z):
     """
     Evaluates a Rational Function Model (rfm), on a triplet of numbers.
@@ -59,22 +210,118 @@ def apply_rfm(num, den, x, y, z):
     Returns:
         the value(s) of the rfm on the input point(s).
     """
-    return apply_poly(num, x, y, z) / apply_poly(den, x, y, z)
+    return apply_rfms([num, den], x, y, z)[0]
+
+
+def apply_rfms(polys, x, y, z):
+    """
+    Evaluates several Rational Function Models (rfm) on the same points.
+
+    The monomials are computed once and shared by all the polynoms, which
+    are then evaluated with a single matrix product.
+
+    Args:
+        polys: list of 2k lists of 20 coefficients, ordered following the
+            RPC convention: numerator and denominator of the first rfm,
+            then numerator and denominator of the second one, and so on
+        x, y, z: triplet of floats. They may be numpy arrays of same shape.
+
+    Returns:
+        numpy array of shape (k,) + shape of the inputs, with the value(s)
+        of each rfm on the input point(s). For a single point given as
+        scalars, list of k np.float64.
+    """
+    if np.isscalar(x) and np.isscalar(y) and np.isscalar(z):
+        # single point: plain float arithmetic avoids the overhead of numpy
+        # calls on tiny arrays. The quotients are computed with numpy
+        # scalars, which give inf or nan on a zero denominator, as arrays do
+        values = [apply_poly(p, x, y, z) for p in polys]
+        return [np.float64(n) / d for n, d in zip(values[0::2], values[1::2])]
+
+    coeffs = np.array(polys, dtype=float)
+    if np.ndim(z) == 0:
+        # same z for all the points: the z terms are folded into the
+        # coefficients, leaving polynoms in x and y only
+        coeffs = restrict_to_altitude(coeffs, z)
+        m = monomials_xy(x, y)
+    else:
+        m = monomials(x, y, z)
+    values = np.tensordot(coeffs, m, axes=1)
+
+    # the quotients are written over the numerators, avoiding a new array
+    rfms = values[0::2]
+    np.divide(rfms, values[1::2], out=rfms)
+    return rfms
+
+
+def normalize(a, offset, scale):
+    """
+    Normalizes coordinates with the offset and scale of an RPC model.
+
+    Args:
+        a (float or array): coordinate(s) to normalize
+        offset, scale (floats): normalization parameters
+
+    Returns:
+        (a - offset) * (1 / scale), computed with a single array allocation.
+        Scalars and arrays follow the same formula, hence give the same values
+    """
+    if np.isscalar(a):
+        return (a - offset) * (1 / scale)
+    out = np.subtract(a, offset, dtype=float)
+    out *= 1 / scale  # one division instead of one per point
+    return out
+
+
+def denormalize(a, offset, scale):
+    """
+    Converts normalized coordinates back, inverse of normalize.
+
+    Args:
+        a (float or array): normalized coordinate(s)
+        offset, scale (floats): normalization parameters
+
+    Returns:
+        a * scale + offset, computed with a single array allocation
+    """
+    if np.isscalar(a):
+        return a * scale + offset
+    out = np.multiply(a, scale, dtype=float)
+    out += offset
+    return out
+
+
+@file_cache.cached_by_file_version(maxsize=128)
+def _read_geotiff_rpc_tags(geotiff_path):
+    """
+    Read the RPC tags of a GeoTIFF file. Results are cached, as opening the
+    file may be costly for remote images.
+
+    Args:
+        geotiff_path (str): path or url to a GeoTIFF file
+
+    Returns:
+        dict: RPC tags of the file. Must not be modified.
+    """
+    with rasterio.open(geotiff_path, 'r') as src:
+        return src.tags(ns='RPC')
 
 
 def rpc_from_geotiff(geotiff_path):
     """
     Read the RPC coefficients from a GeoTIFF file and return an RPCModel object.
 
+    The RPC tags are read only once per file: subsequent calls on the same
+    path reuse them, unless the (local) file was modified in the meantime.
+
     Args:
-        geotiff_path (str): path or url to a GeoTIFF file
+        geotiff_path (str): path or url to a GeoTIFF file, or any other input
+            accepted by rasterio.open
 
     Returns:
         instance of the rpc_model.RPCModel class
     """
-    with rasterio.open(geotiff_path, 'r') as src:
-        rpc_dict = src.tags(ns='RPC')
-    return RPCModel(rpc_dict)
+    return RPCModel(_read_geotiff_rpc_tags(geotiff_path))
 
 
 def rpc_from_rpc_file(rpc_file_path):
@@ -90,6 +337,23 @@ def rpc_from_rpc_file(rpc_file_path):
     return RPCModel(read_rpc_file(rpc_file_path))
 
 
+def parse_coefficients(coeffs):
+    """
+    Read the coefficients of an RPC polynom.
+
+    Args:
+        coeffs (str or sequence): either a string of space-separated numbers,
+            as found in geotiff tags and RPC sidecar files, or a sequence of
+            numbers
+
+    Returns:
+        list of floats
+    """
+    if isinstance(coeffs, str):
+        coeffs = coeffs.split()
+    return list(map(float, coeffs))
+
+
 class RPCModel:
     def __init__(self, d, dict_format="geotiff"):
         """
@@ -114,16 +378,16 @@ class RPCModel:
             self.lon_scale = float(d['LONG_SCALE'])
             self.alt_scale = float(d['HEIGHT_SCALE'])
 
-            self.row_num = list(map(float, d['LINE_NUM_COEFF'].split()))
-            self.row_den = list(map(float, d['LINE_DEN_COEFF'].split()))
-            self.col_num = list(map(float, d['SAMP_NUM_COEFF'].split()))
-            self.col_den = list(map(float, d['SAMP_DEN_COEFF'].split()))
+            self.row_num = parse_coefficients(d['LINE_NUM_COEFF'])
+            self.row_den = parse_coefficients(d['LINE_DEN_COEFF'])
+            self.col_num = parse_coefficients(d['SAMP_NUM_COEFF'])
+            self.col_den = parse_coefficients(d['SAMP_DEN_COEFF'])
 
             if 'LON_NUM_COEFF' in d:
-                self.lon_num = list(map(float, d['LON_NUM_COEFF'].split()))
-                self.lon_den = list(map(float, d['LON_DEN_COEFF'].split()))
-                self.lat_num = list(map(float, d['LAT_NUM_COEFF'].split()))
-                self.lat_den = list(map(float, d['LAT_DEN_COEFF'].split()))
+                self.lon_num = parse_coefficients(d['LON_NUM_COEFF'])
+                self.lon_den = parse_coefficients(d['LON_DEN_COEFF'])
+                self.lat_num = parse_coefficients(d['LAT_NUM_COEFF'])
+                self.lat_den = parse_coefficients(d['LAT_DEN_COEFF'])
 
         elif dict_format == "rpcm":
             self.__dict__ = d
@@ -148,19 +412,72 @@ class RPCModel:
             float or list: horizontal image coordinate(s) (column index, ie x)
             float or list: vertical image coordinate(s) (row index, ie y)
         """
-        nlon = (np.asarray(lon) - self.lon_offset) / self.lon_scale
-        nlat = (np.asarray(lat) - self.lat_offset) / self.lat_scale
-        nalt = (np.asarray(alt) - self.alt_offset) / self.alt_scale
+        nlon = normalize(lon, self.lon_offset, self.lon_scale)
+        nlat = normalize(lat, self.lat_offset, self.lat_scale)
+        nalt = normalize(alt, self.alt_offset, self.alt_scale)
+
+        ncol, nrow = self._normalized_projection(nlon, nlat, nalt)
+        col = denormalize(ncol, self.col_offset, self.col_scale)
+        row = denormalize(nrow, self.row_offset, self.row_scale)
+
+        return col, row
 
-        col = apply_rfm(self.col_num, self.col_den, nlat, nlon, nalt)
-        row = apply_rfm(self.row_num, self.row_den, nlat, nlon, nalt)
 
-        col = col * self.col_scale + self.col_offset
-        row = row * self.row_scale + self.row_offset
+    def _normalized_projection(self, lon, lat, alt):
+        """
+        Evaluate the projection function on normalized coordinates.
 
+        Args:
+            lon, lat, alt: normalized longitude(s), latitude(s) and altitude(s)
+                of the input 3D point(s)
+
+        Returns:
+            normalized column(s) and row(s) of the projected point(s)
+        """
+        col, row = apply_rfms([self.col_num, self.col_den,
+                               self.row_num, self.row_den], lat, lon, alt)
         return col, row
 
 
+    def projection_jacobian(self, lon, lat, alt):
+        """
+        Compute the partial derivatives of the projection function.
+
+        Args:
+            lon (float or list): longitude(s) of the input 3D point(s)
+            lat (float or list): latitude(s) of the input 3D point(s)
+            alt (float or list): altitude(s) of the input 3D point(s)
+
+        Returns:
+            numpy array of shape (2, 3) + shape of the inputs: derivatives of
+            the column (first line) and of the row (second line) with
+            respect to longitude, latitude and altitude, in pixels per
+            degree and pixels per meter
+        """
+        nlon = normalize(lon, self.lon_offset, self.lon_scale)
+        nlat = normalize(lat, self.lat_offset, self.lat_scale)
+        nalt = normalize(alt, self.alt_offset, self.alt_scale)
+
+        coeffs = np.array([self.col_num, self.col_den,
+                           self.row_num, self.row_den], dtype=float)
+        values = np.tensordot(coeffs, monomials(nlat, nlon, nalt), axes=1)
+        derivatives = np.tensordot(coeffs, monomials_gradient(nlat, nlon, nalt),
+                                   axes=(1, 1))
+
+        # quotient rule, with the derivatives ordered as (lat, lon, alt)
+        num, den = values[0::2, None], values[1::2, None]
+        jacobian = (derivatives[0::2] * den - num * derivatives[1::2]) / den**2
+
+        # from normalized to image and geographic units, ordered as (lon, lat, alt)
+        jacobian = jacobian[:, [1, 0, 2]]
+        jacobian[0] *= self.col_scale
+        jacobian[1] *= self.row_scale
+        jacobian[:, 0] /= self.lon_scale
+        jacobian[:, 1] /= self.lat_scale
+        jacobian[:, 2] /= self.alt_scale
+        return jacobian
+
+
     def localization(self, col, row, alt, return_normalized=False):
         """
         Convert image coordinates plus altitude into geographic coordinates.
@@ -174,19 +491,19 @@ class RPCModel:
             float or list: longitude(s)
             float or list: latitude(s)
         """
-        ncol = (np.asarray(col) - self.col_offset) / self.col_scale
-        nrow = (np.asarray(row) - self.row_offset) / self.row_scale
-        nalt = (np.asarray(alt) - self.alt_offset) / self.alt_scale
+        ncol = normalize(col, self.col_offset, self.col_scale)
+        nrow = normalize(row, self.row_offset, self.row_scale)
+        nalt = normalize(alt, self.alt_offset, self.alt_scale)
 
         if not hasattr(self, 'lat_num'):
             lon, lat = self.localization_iterative(ncol, nrow, nalt)
         else:
-            lon = apply_rfm(self.lon_num, self.lon_den, nrow, ncol, nalt)
-            lat = apply_rfm(self.lat_num, self.lat_den, nrow, ncol, nalt)
+            lon, lat = apply_rfms([self.lon_num, self.lon_den,
+                                   self.lat_num, self.lat_den], nrow, ncol, nalt)
 
         if not return_normalized:
-            lon = lon * self.lon_scale + self.lon_offset
-            lat = lat * self.lat_scale + self.lat_offset
+            lon = denormalize(lon, self.lon_offset, self.lon_scale)
+            lat = denormalize(lat, self.lat_offset, self.lat_scale)
 
         return lon, lat
 
@@ -208,67 +525,120 @@ class RPCModel:
             MaxLocalizationIterationsError: if the while loop exceeds the max
                 number of iterations, which is set to 100.
         """
-        # target point: Xf (f for final)
-        Xf = np.vstack([col, row]).T
+        # the points are processed as flat arrays, reshaped at the end
+        shape = np.broadcast_shapes(np.shape(col), np.shape(row), np.shape(alt))
+        col, row, alt = [np.broadcast_to(a, shape).ravel() for a in (col, row, alt)]
+
+        if col.size == 1:
+            # single point: scalar arithmetic avoids the overhead of numpy
+            # calls on tiny arrays
+            lon, lat = self._localization_iterative_point(col[0], row[0], alt[0])
+            return np.full(shape, lon)[()], np.full(shape, lat)[()]
 
         # use 3 corners of the lon, lat domain and project them into the image
         # to get the first estimation of (lon, lat)
         # EPS is 2 for the first iteration, then 0.1.
-        lon = -col ** 0  # vector of ones
-        lat = -col ** 0
+        lon = -np.ones(col.shape)  # vector of ones
+        lat = -np.ones(col.shape)
         EPS = 2
-        x0 = apply_rfm(self.col_num, self.col_den, lat, lon, alt)
-        y0 = apply_rfm(self.row_num, self.row_den, lat, lon, alt)
-        x1 = apply_rfm(self.col_num, self.col_den, lat, lon + EPS, alt)
-        y1 = apply_rfm(self.row_num, self.row_den, lat, lon + EPS, alt)
-        x2 = apply_rfm(self.col_num, self.col_den, lat + EPS, lon, alt)
-        y2 = apply_rfm(self.row_num, self.row_den, lat + EPS, lon, alt)
+
+        # indices of the points that haven't converged yet: only these are
+        # evaluated and updated at each iteration
+        active = np.arange(col.size)
 
         n = 0
-        while not np.all((x0 - col) ** 2 + (y0 - row) ** 2 < 1e-18):
+        while True:
+            x0, y0 = self._normalized_projection(lon[active], lat[active], alt[active])
+
+            # drop the points that have converged. The test is written so that
+            # points with a NaN residual (NaN pixel or altitude) are kept: they
+            # never converge, and the iteration limit error is raised
+            todo = ~((x0 - col[active]) ** 2 + (y0 - row[active]) ** 2 < 1e-18)
+            if not np.any(todo):
+                break
+            active, x0, y0 = active[todo], x0[todo], y0[todo]
 
             if n > 100:
                 raise MaxLocalizationIterationsError("Max localization iterations (100) exceeded")
 
-            X0 = np.vstack([x0, y0]).T
-            X1 = np.vstack([x1, y1]).T
-            X2 = np.vstack([x2, y2]).T
-            e1 = X1 - X0
-            e2 = X2 - X0
-            u  = Xf - X0
-
-            # project u on the base (e1, e2): u = a1*e1 + a2*e2
-            # the exact computation is given by:
-            #   M = np.vstack((e1, e2)).T
-            #   a = np.dot(np.linalg.inv(M), u)
-            # but I don't know how to vectorize this.
-            # Assuming that e1 and e2 are orthogonal, a1 is given by
-            # <u, e1> / <e1, e1>
-            num = np.sum(np.multiply(u, e1), axis=1)
-            den = np.sum(np.multiply(e1, e1), axis=1)
-            a1 = np.divide(num, den).squeeze()
-
-            num = np.sum(np.multiply(u, e2), axis=1)
-            den = np.sum(np.multiply(e2, e2), axis=1)
-            a2 = np.divide(num, den).squeeze()
-
-            # use the coefficients a1, a2 to compute an approximation of the
-            # point on the gound which in turn will give us the new X0
-            lon += a1 * EPS
-            lat += a2 * EPS
-
-            # update X0, X1 and X2
+            lon[active], lat[active] = self._localization_step(col[active], row[active],
+                                                               alt[active], lon[active],
+                                                               lat[active], x0, y0, EPS)
             EPS = .1
-            x0 = apply_rfm(self.col_num, self.col_den, lat, lon, alt)
-            y0 = apply_rfm(self.row_num, self.row_den, lat, lon, alt)
-            x1 = apply_rfm(self.col_num, self.col_den, lat, lon + EPS, alt)
-            y1 = apply_rfm(self.row_num, self.row_den, lat, lon + EPS, alt)
-            x2 = apply_rfm(self.col_num, self.col_den, lat + EPS, lon, alt)
-            y2 = apply_rfm(self.row_num, self.row_den, lat + EPS, lon, alt)
+            n += 1
+
+        # [()] turns 0-d arrays into scalars
+        return lon.reshape(shape)[()], lat.reshape(shape)[()]
+
+
+    def _localization_iterative_point(self, col, row, alt):
+        """
+        Iterative localization of a single point, following the same steps
+        as localization_iterative.
+
+        Args:
+            col, row, alt (np.float64): normalized image coordinates and
+                altitude. Numpy scalars, unlike Python floats, give inf or nan
+                instead of raising on a division by zero or an overflow, as
+                in the array case, so that points that don't converge reach
+                the iteration limit
+
+        Returns:
+            lon, lat (np.float64): normalized longitude and latitude
+        """
+        lon = lat = np.float64(-1)
+        EPS = 2
+
+        n = 0
+        while True:
+            x0, y0 = self._normalized_projection(lon, lat, alt)
+            if (x0 - col) ** 2 + (y0 - row) ** 2 < 1e-18:
+                return lon, lat
 
+            if n > 100:
+                raise MaxLocalizationIterationsError("Max localization iterations (100) exceeded")
+
+            lon, lat = self._localization_step(col, row, alt, lon, lat, x0, y0, EPS)
+            EPS = .1
             n += 1
 
-        return lon, lat
+
+    def _localization_step(self, col, row, alt, lon, lat, x0, y0, EPS):
+        """
+        One iteration of the iterative localization.
+
+        Args:
+            col, row, alt: normalized image coordinates and altitude of the
+                point(s) to localize
+            lon, lat: current estimate of the normalized longitude and latitude
+            x0, y0: normalized projection of the current estimate
+            EPS: step used to approximate the projection function locally
+
+        Returns:
+            lon, lat: new estimate of the normalized longitude and latitude
+        """
+        x1, y1 = self._normalized_projection(lon + EPS, lat, alt)
+        x2, y2 = self._normalized_projection(lon, lat + EPS, alt)
+
+        # components of the vectors e1 = X1 - X0, e2 = X2 - X0 and u = Xf - X0,
+        # where Xf = (col, row) is the target point (f for final)
+        e1x, e1y = x1 - x0, y1 - y0
+        e2x, e2y = x2 - x0, y2 - y0
+        ux, uy = col - x0, row - y0
+
+        # project u on the base (e1, e2): u = a1*e1 + a2*e2
+        # the exact computation is given by:
+        #   M = np.vstack((e1, e2)).T
+        #   a = np.dot(np.linalg.inv(M), u)
+        # but I don't know how to vectorize this.
+        # Assuming that e1 and e2 are orthogonal, a1 is given by
+        # <u, e1> / <e1, e1>
+        a1 = (ux * e1x + uy * e1y) / (e1x * e1x + e1y * e1y)
+        a2 = (ux * e2x + uy * e2y) / (e2x * e2x + e2y * e2y)
+
+        # use the coefficients a1, a2 to compute an approximation of the
+        # point on the gound which in turn will give us the new X0
+        return lon + a1 * EPS, lat + a2 * EPS
 
 
     def incidence_angles(self, lon, lat, z):
@@ -277,44 +647,61 @@ class RPCModel:
 
         Args:
             self (rpc_model.RPCModel): camera model
-            lon, lat, z (floats): longitude, latitude and altitude
+            lon, lat, z (floats or arrays): longitude(s), latitude(s) and
+                altitude(s) of the input point(s)
 
         Return:
             zenith (float in [0, 90]): angle wrt the vertical, in degrees
             azimuth (float in [0, 360]): angle wrt to the north, clockwise, in degrees
         """
-        # project the input 3D point in the image
-        col, row = self.projection(lon, lat, z)
+        z = np.asarray(z)
 
-        # localize it with two different altitudes
-        s = 100  # scale factor, in meters
-        lon0, lat0 = self.localization(col, row, z + 0*s)
-        lon1, lat1 = self.localization(col, row, z + 1*s)
+        # direction of the line of sight: variation of the longitude and
+        # latitude with the altitude, at constant image coordinates. It is
+        # given by the implicit function theorem applied to the projection
+        (c_lon, c_lat, c_alt), (r_lon, r_lat, r_alt) = self.projection_jacobian(lon, lat, z)
+        det = c_lon * r_lat - c_lat * r_lon
+        dlon = (c_lat * r_alt - r_lat * c_alt) / det
+        dlat = (r_lon * c_alt - c_lon * r_alt) / det
 
-        # convert to UTM
-        epsg = geo.compute_epsg(lon, lat)
-        transformer = pyproj.Transformer.from_crs(4326, epsg, always_xy=True)
-        [x0, x1], [y0, y1] = transformer.transform([lon0, lon1], [lat0, lat1])
+        # follow it on a segment of given length
+        s = 100  # scale factor, in meters
+        lon0, lat0 = np.asarray(lon), np.asarray(lat)
+        lon1, lat1 = lon0 + s * dlon, lat0 + s * dlat
+
+        # convert to UTM, one zone at a time
+        lon0, lat0, lon1, lat1, epsg = np.broadcast_arrays(lon0, lat0, lon1, lat1,
+                                                           geo.compute_epsg(lon, lat))
+        x0, y0, x1, y1 = [np.empty(epsg.shape) for _ in range(4)]
+        for e in np.unique(epsg):
+            i = epsg == e
+            transformer = geo.lonlat_to_epsg_transformer(int(e))
+            [x0[i], x1[i]], [y0[i], y1[i]] = transformer.transform(np.array([lon0[i], lon1[i]]),
+                                                                   np.array([lat0[i], lat1[i]]))
 
         # compute local satellite incidence direction
-        p0 = np.array([x0, y0, z + 0*s])
-        p1 = np.array([x1, y1, z + 1*s])
-        satellite_direction = (p1 - p0) / np.linalg.norm(p1 - p0)
+        z = np.broadcast_to(z, x0.shape)
+        p0 = np.array([x0, y0, z])
+        p1 = np.array([x1, y1, z + s])
+        satellite_direction = (p1 - p0) / np.linalg.norm(p1 - p0, axis=0)
 
         # zenith is the angle between the satellite direction and the vertical
-        zenith = np.degrees(np.arccos(np.dot(satellite_direction, [0, 0, 1])))
+        zenith = np.degrees(np.arccos(satellite_direction[2]))
 
         # azimuth is the clockwise angle with respect to the North
         # of the projection of the satellite direction on the horizontal plane
         # This can be computed by taking the argument of a complex number
         # in a coordinate system where northing is the x axis and easting the y axis
         easting, northing = satellite_direction[:2]
-        azimuth = np.degrees(np.angle(complex(northing, easting)))
+        azimuth = np.degrees(np.angle(northing + 1j * easting))
 
         return zenith, azimuth
 
 
     def __repr__(self):
+        def fmt(coeffs):
+            return ' '.join(map('{: .4f}'.format, coeffs))
+
         return """
     # Projection function coefficients
       col_num = {}
@@ -332,10 +719,10 @@ class RPCModel:
       col_scale = {}
       lat_scale = {}
       lon_scale = {}
-      alt_scale = {}""".format(' '.join(['{: .4f}'.format(x) for x in self.col_num]),
-                               ' '.join(['{: .4f}'.format(x) for x in self.col_den]),
-                               ' '.join(['{: .4f}'.format(x) for x in self.row_num]),
-                               ' '.join(['{: .4f}'.format(x) for x in self.row_den]),
+      alt_scale = {}""".format(fmt(self.col_num),
+                               fmt(self.col_den),
+                               fmt(self.row_num),
+                               fmt(self.row_den),
                                self.row_offset,
                                self.col_offset,
                                self.lat_offset,
@@ -32,15 +32,16 @@ def bounding_box2D(pts):
     Rectangular bounding box for a list of 2D points.
 
     Args:
-        pts (list): list of 2D points represented as 2-tuples or lists of length 2
+        pts (list or array): list of 2D points represented as 2-tuples or
+            lists of length 2, or array of shape (n, 2)
 
     Returns:
         x, y, w, h (floats): coordinates of the top-left corner, width and
             height of the bounding box
     """
-    dim = len(pts[0])  # should be 2
-    bb_min = [min([t[i] for t in pts]) for i in range(dim)]
-    bb_max = [max([t[i] for t in pts]) for i in range(dim)]
+    pts = np.asarray(pts, dtype=float)
+    bb_min = pts.min(axis=0)
+    bb_max = pts.max(axis=0)
     return bb_min[0], bb_min[1], bb_max[0] - bb_min[0], bb_max[1] - bb_min[1]
 
 
@@ -56,20 +57,22 @@ def points_apply_homography(H, pts):
     Returns:
         numpy array: list of transformed points, one per line
     """
-    pts = np.asarray(pts)
+    pts = np.asarray(pts, dtype=float)
 
     # convert the input points to homogeneous coordinates
     if len(pts[0]) < 2:
         print("""points_apply_homography: ERROR the input must be a numpy array
           of 2D points, one point per line""")
         return
-    pts = np.hstack((pts[:, :2], np.ones(len(pts))))
+    hpts = np.empty((len(pts), 3))
+    hpts[:, :2] = pts[:, :2]
+    hpts[:, 2] = 1
 
     # apply the transformation
-    Hpts = (np.dot(H, pts.T)).T
+    Hpts = hpts @ np.asarray(H).T
 
     # normalize the homogeneous result and trim the extra dimension
-    Hpts = Hpts * (1.0 / np.tile( Hpts[:, 2], (3, 1)) ).T
+    Hpts /= Hpts[:, 2:]
     return Hpts[:, :2]
 
 
@@ -91,7 +94,7 @@ def bounding_box_of_projected_aoi(rpc, aoi, z=0, homography=None):
     """
     lons, lats = np.asarray(aoi['coordinates']).squeeze().T
     x, y = rpc.projection(lons, lats, z)
-    pts = list(zip(x, y))
+    pts = np.column_stack((x, y))
     if homography is not None:
         pts = points_apply_homography(homography, pts)
     return np.round(bounding_box2D(pts)).astype(int)
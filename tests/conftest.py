@@ -0,0 +1,46 @@
+import contextlib
+import os
+
+import numpy as np
+import pytest
+import rasterio
+
+from rpcm import rpc_from_rpc_file
+from rpcm import utils
+
+here = os.path.abspath(os.path.dirname(__file__))
+files_dir = os.path.join(here, "test_rpc_files")
+
+
+@pytest.fixture
+def write_rpc_geotiff():
+    """
+    Return a function that writes a small GeoTIFF image whose header holds
+    the RPC model of one of the RPC files of the test data folder, and
+    returns this RPC model.
+    """
+    def write(path, rpc_filename="rpc_WV3.xml"):
+        rpc = rpc_from_rpc_file(os.path.join(files_dir, rpc_filename))
+        utils.rasterio_write(path, np.zeros((8, 8), dtype=np.uint8))
+        with rasterio.open(path, "r+") as f:
+            f.update_tags(ns="RPC", **rpc.to_geotiff_dict())
+        return rpc
+
+    return write
+
+
+@pytest.fixture
+def rewriting():
+    """
+    Return a context manager for rewriting a file. On exit, the modification
+    time of the file is pushed one second after the one it had on entry: two
+    writes may otherwise get the same timestamp on filesystems with a coarse
+    time resolution, and the file caches would not see the change.
+    """
+    @contextlib.contextmanager
+    def rewrite(path):
+        st = os.stat(path)
+        yield
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    return rewrite
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import rpcm
+from rpcm import utils
+
+
+def aoi_around(lon, lat, size=0.002):
+    """
+    Square AOI centered on a longitude, latitude point.
+    """
+    r = size / 2
+    return {"type": "Polygon",
+            "coordinates": [[[lon - r, lat - r], [lon + r, lat - r],
+                             [lon + r, lat + r], [lon - r, lat + r],
+                             [lon - r, lat - r]]]}
+
+
+def check_crop(img, crop, rpc, aoi, z):
+    """
+    Check that projection and localization wrt a crop match the ones in the
+    full image, shifted by the position of the crop.
+    """
+    x0, y0 = utils.bounding_box_of_projected_aoi(rpc, aoi, z)[:2]
+    lons, lats = np.asarray(aoi["coordinates"][0][:4]).T
+
+    x, y = rpc.projection(lons, lats, z)
+    cx, cy = rpcm.projection(img, lons, lats, z, crop_path=crop)
+    np.testing.assert_allclose(cx, x - x0)
+    np.testing.assert_allclose(cy, y - y0)
+
+    lons2, lats2 = rpcm.localization(img, cx, cy, z, crop_path=crop)
+    np.testing.assert_allclose(lons2, lons, rtol=0, atol=1e-7)
+    np.testing.assert_allclose(lats2, lats, rtol=0, atol=1e-7)
+
+
+def test_crop_projection_localization(tmp_path, write_rpc_geotiff, rewriting):
+    """
+    Check projection and localization wrt a crop, then rewrite the crop file
+    with another AOI and check that the new crop transform is used.
+    """
+    img = str(tmp_path / "img.tif")
+    crop = str(tmp_path / "crop.tif")
+    rpc = write_rpc_geotiff(img)
+    lon, lat, z = rpc.lon_offset, rpc.lat_offset, rpc.alt_offset
+
+    aoi = aoi_around(lon, lat)
+    rpcm.crop(crop, img, aoi, z)
+    check_crop(img, crop, rpc, aoi, z)
+
+    C, C_inv = rpcm._load_crop_transform(crop)
+    np.testing.assert_allclose(C @ C_inv, np.eye(3), atol=1e-12)
+
+    aoi = aoi_around(lon + 0.003, lat - 0.002)
+    with rewriting(crop):
+        rpcm.crop(crop, img, aoi, z)
+    check_crop(img, crop, rpc, aoi, z)
+
+
+@pytest.mark.parametrize("C", [
+    [[1, 0, -120], [0, 1, -45], [0, 0, 1]],
+    [[1.1, 0.1, 5], [0.05, 0.9, -3], [0, 0, 1]],
+    [[1.1, 0.1, 5], [0.05, 0.9, -3], [1e-5, 2e-5, 1]],
+    [[2, 0, 10], [0, 2, 20], [0, 0, 2]],
+])
+def test_apply_crop_transform(C):
+    """
+    Compare the crop transform of single points and arrays of points with
+    the product with the homogeneous coordinates.
+    """
+    C = np.array(C, dtype=float)
+    x = np.array([0, 100, 250.5, -30])
+    y = np.array([0, 200, 12.25, 75])
+
+    expected = np.array([C @ [a, b, 1] for a, b in zip(x, y)])
+    expected = expected[:, :2] / expected[:, 2:]
+
+    np.testing.assert_allclose(np.transpose(rpcm._apply_crop_transform(C, x, y)),
+                               expected)
+    np.testing.assert_allclose(rpcm._apply_crop_transform(C, list(x), list(y)),
+                               expected.T)
+    for (a, b), e in zip(zip(x, y), expected):
+        np.testing.assert_allclose(rpcm._apply_crop_transform(C, a, b), e)
@@ -0,0 +1,49 @@
+import io
+import os
+
+from rpcm import file_cache
+
+
+def test_cached_by_file_version(tmp_path):
+    """
+    Check that the results for a path are reused, and that inputs that are
+    not paths are read at each call.
+    """
+    calls = []
+
+    @file_cache.cached_by_file_version(maxsize=4)
+    def read(path):
+        calls.append(path)
+        return len(calls)
+
+    path = tmp_path / "f.txt"
+    path.write_text("content")
+
+    assert read(str(path)) == read(str(path)) == 1
+    assert read.cache_info().hits == 1
+
+    f = io.BytesIO(b"content")
+    assert read(f) == 2
+    assert read(f) == 3
+    assert read.cache_info().currsize == 1
+
+
+def test_cached_by_file_version_relative_path(tmp_path, monkeypatch):
+    """
+    Check that a relative path doesn't get the cached result of another file
+    with the same version after a change of working directory.
+    """
+    @file_cache.cached_by_file_version(maxsize=4)
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    for d, content in [("a", "first"), ("b", "other")]:
+        (tmp_path / d).mkdir()
+        (tmp_path / d / "f.txt").write_text(content)
+        os.utime(tmp_path / d / "f.txt", ns=(0, 0))
+
+    monkeypatch.chdir(tmp_path / "a")
+    assert read("f.txt") == "first"
+    monkeypatch.chdir(tmp_path / "b")
+    assert read("f.txt") == "other"
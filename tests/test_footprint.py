@@ -0,0 +1,37 @@
+import numpy as np
+
+import rpcm
+
+
+def expected_footprint(rpc, h, w, z):
+    """
+    Localization of the corners of an image of size h x w.
+    """
+    lons, lats = rpc.localization([0, 0, w, w, 0], [0, h, h, 0, 0], z)
+    return np.column_stack((lons, lats))
+
+
+def test_image_footprint_cache(tmp_path, write_rpc_geotiff, rewriting):
+    """
+    Check that the header of an image is read once for several footprints,
+    and read again when the image is rewritten.
+    """
+    img = str(tmp_path / "img.tif")
+    rpc = write_rpc_geotiff(img, "rpc_WV3.xml")
+    z = rpc.alt_offset
+
+    hits = rpcm._read_image_header.cache_info().hits
+    f1 = rpcm.image_footprint(img, z)
+    f2 = rpcm.image_footprint(img, z)
+    assert rpcm._read_image_header.cache_info().hits == hits + 1
+    assert f1 == f2
+    np.testing.assert_allclose(f1["geometry"]["coordinates"][0],
+                               expected_footprint(rpc, 8, 8, z))
+
+    with rewriting(img):
+        rpc = write_rpc_geotiff(img, "rpc_PLEIADES.xml")
+
+    z = rpc.alt_offset
+    f3 = rpcm.image_footprint(img, z)
+    np.testing.assert_allclose(f3["geometry"]["coordinates"][0],
+                               expected_footprint(rpc, 8, 8, z))
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from rpcm import geo
+
+
+def test_compute_epsg():
+    """
+    Test the EPSG codes computed for arrays of points in both hemispheres,
+    including points on the antimeridian, and for a single point.
+    """
+    lon = [2.35, -58.6, 180, -180, 179.9, -0.1]
+    lat = [48.85, -34.5, 10, -10, -45, 0.5]
+    expected = [32631, 32721, 32660, 32701, 32760, 32630]
+
+    np.testing.assert_array_equal(geo.compute_epsg(lon, lat), expected)
+    np.testing.assert_array_equal(geo.compute_epsg(np.reshape(lon, (2, 3)),
+                                                   np.reshape(lat, (2, 3))),
+                                  np.reshape(expected, (2, 3)))
+
+    epsg = geo.compute_epsg(lon[0], lat[0])
+    assert isinstance(epsg, int) and epsg == expected[0]
+
+
+@pytest.mark.parametrize("lon, lat", [(np.nan, 45), (2.35, np.nan),
+                                      ([2.35, np.inf], [45, 45])])
+def test_compute_epsg_not_finite(lon, lat):
+    """
+    Test that non-finite longitudes or latitudes are rejected.
+    """
+    with pytest.raises(ValueError):
+        geo.compute_epsg(lon, lat)
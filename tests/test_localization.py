@@ -1,8 +1,10 @@
 import os
 
+import numpy as np
 import pytest
 
 from rpcm import RPCModel
+from rpcm import rpc_from_rpc_file
 from rpcm.rpc_file_readers import read_rpc_ikonos
 from rpcm.rpc_model import MaxLocalizationIterationsError
 
@@ -25,3 +27,36 @@ def test_localization_break():
         rpc.localization(0, 0, 70)
 
     rpc.localization(0, 0, 90)
+
+
+@pytest.mark.parametrize("n", [1, 2])
+def test_localization_break_point(n):
+    """
+    With the Skysat L1A RPC, the localization of the projection of a point
+    far outside the image diverges: the linear approximation of the
+    projection degenerates (division by zero, overflow) and the iteration
+    limit is reached. Single points and arrays must fail the same way.
+    """
+    path = os.path.join(files_dir, "20191015_073816_ssc1d3_0011_basic_l1a_panchromatic_dn_RPC.TXT")
+    with open(path) as f:
+        rpc = RPCModel(read_rpc_ikonos(f.read()))
+
+    col, row = rpc.projection(49, 25, 0)
+    col, row = (col, row) if n == 1 else ([col] * n, [row] * n)
+    with np.errstate(all="ignore"), pytest.raises(MaxLocalizationIterationsError):
+        rpc.localization(col, row, 0)
+
+
+@pytest.mark.parametrize("col, row, alt", [
+    ([100, np.nan], [100, 200], 0),
+    ([100, 200], [100, 200], [0, np.nan]),
+    (np.nan, 100, 0),
+])
+def test_localization_iterative_nan(col, row, alt):
+    """
+    A NaN pixel or altitude never converges in the iterative localization:
+    an error is raised instead of returning the initial guess
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, "rpc_WV3.xml"))
+    with pytest.raises(MaxLocalizationIterationsError):
+        rpc.localization(col, row, rpc.alt_offset + np.asarray(alt))
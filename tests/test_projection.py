@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import rpcm
+
+
+def test_coerce_points():
+    """
+    Lists and integer inputs are converted to float64 arrays, scalars and
+    missing altitudes are passed through.
+    """
+    lon, lat, z = rpcm._coerce_points([1, 2, 3], np.arange(3), None)
+    assert z is None
+    for a in (lon, lat):
+        assert isinstance(a, np.ndarray) and a.dtype == np.float64
+        assert a.flags.c_contiguous
+    np.testing.assert_array_equal(lon, [1, 2, 3])
+
+    lon, lat, z = rpcm._coerce_points([[1, 2], [3, 4]], 5, [6, 7])
+    assert lon.shape == (2, 2) and lat.shape == () and z.shape == (2,)
+    assert lon.dtype == lat.dtype == z.dtype == np.float64
+
+    assert rpcm._coerce_points(1, 2.5, None) == [1, 2.5, None]
+
+    # 0-d arrays keep their shape
+    lon, lat, z = rpcm._coerce_points(np.array(1), 2, 3)
+    assert lon.shape == lat.shape == z.shape == ()
+
+
+@pytest.mark.parametrize("a, b, c", [
+    ([1, 2, 3], [1, 2], 0),
+    ([1, 2], [1, 2], [0, 0, 0]),
+    (np.zeros((2, 3)), np.zeros(2), 0),
+])
+def test_mismatched_shapes(tmp_path, a, b, c):
+    """
+    Coordinates of incompatible shapes are rejected before the image is
+    opened.
+    """
+    img = str(tmp_path / "missing.tif")
+    with pytest.raises(ValueError):
+        rpcm.projection(img, a, b, c)
+    with pytest.raises(ValueError):
+        rpcm.localization(img, a, b, c)
+
+
+def test_projection_localization_int_lists(tmp_path, write_rpc_geotiff):
+    """
+    Lists of integers give the same results as float arrays.
+    """
+    img = str(tmp_path / "img.tif")
+    rpc = write_rpc_geotiff(img)
+    lon, lat, z = int(rpc.lon_offset), int(rpc.lat_offset), int(rpc.alt_offset)
+
+    x, y = rpcm.projection(img, [lon, lon], [lat, lat], [z, z + 10])
+    expected = rpc.projection(np.array([lon, lon], dtype=float),
+                              np.array([lat, lat], dtype=float),
+                              np.array([z, z + 10], dtype=float))
+    np.testing.assert_array_equal([x, y], expected)
+
+    cols, rows = [100, 2000], [300, 4000]
+    lons, lats = rpcm.localization(img, cols, rows, [z, z])
+    expected = rpc.localization(np.array(cols, dtype=float),
+                                np.array(rows, dtype=float),
+                                np.array([z, z], dtype=float))
+    np.testing.assert_array_equal([lons, lats], expected)
@@ -1,6 +1,12 @@
+import io
 import os
 
+import numpy as np
+import rasterio
+
 from rpcm import RPCModel
+from rpcm import rpc_from_geotiff
+from rpcm import utils
 from rpcm.rpc_file_readers import read_rpc_file
 
 here = os.path.abspath(os.path.dirname(__file__))
@@ -20,3 +26,21 @@ def test_rpc_constructors():
     rpcm_rpc = RPCModel(rpcm_dict, dict_format="rpcm")
 
     assert geotiff_rpc == rpcm_rpc
+
+
+def test_rpc_from_geotiff_file_object(tmp_path):
+    """
+    Test that the RPC model of an in-memory GeoTIFF file can be read, and is
+    the same as the one written in the file.
+    """
+    rpc = RPCModel(read_rpc_file(os.path.join(files_dir, "rpc_IKONOS.txt")))
+
+    path = str(tmp_path / "img.tif")
+    utils.rasterio_write(path, np.zeros((8, 8), dtype=np.uint8))
+    with rasterio.open(path, "r+") as f:
+        f.update_tags(ns="RPC", **rpc.to_geotiff_dict())
+
+    with open(path, "rb") as f:
+        tif_bytes = f.read()
+
+    assert rpc_from_geotiff(io.BytesIO(tif_bytes)) == rpc
@@ -1,8 +1,10 @@
 import os
+import shutil
 
 import pytest
 
 from rpcm import rpc_from_rpc_file
+from rpcm.rpc_file_readers import read_rpc_file
 
 here = os.path.abspath(os.path.dirname(__file__))
 files_dir = os.path.join(here, "test_rpc_files")
@@ -10,10 +12,10 @@ files_dir = os.path.join(here, "test_rpc_files")
 
 def supported_files():
     """
-    Gives the list of files that should be correctly
+    Gives the list of names of the files that should be correctly
     parsed by `rpc_from_rpc_file`
     """
-    filenames = [
+    return [
         "rpc_IKONOS.txt",
         "rpc_PLEIADES.xml",
         "rpc_SPOT6.xml",
@@ -22,31 +24,82 @@ def supported_files():
         "rpc_WV3.xml",
     ]
 
-    return [os.path.join(files_dir, filename) for filename in filenames]
-
 
 def unsupported_files():
     """
-    Gives the list of files that `rpc_from_rpc_file` should not be
-    able to parse
+    Gives the list of names of the files that `rpc_from_rpc_file` should
+    not be able to parse
+    """
+    return ["rpc_unsupported.xml"]
+
+
+@pytest.mark.parametrize("filename", supported_files())
+def test_successful_rpc_file_parsing(filename):
+    """
+    Check that the file can be parsed without errors being raised
+    """
+    rpc_from_rpc_file(os.path.join(files_dir, filename))
+
+
+@pytest.mark.parametrize("filename", unsupported_files())
+def test_failing_rpc_file_parsing(filename):
+    """
+    Check that the file raises an error when being parsed
     """
-    filenames = ["rpc_unsupported.xml"]
+    with pytest.raises(NotImplementedError, match="XML file .* not supported"):
+        rpc_from_rpc_file(os.path.join(files_dir, filename))
 
-    return [os.path.join(files_dir, filename) for filename in filenames]
 
+def test_rpc_file_cache_copy():
+    """
+    Check that modifying the dict returned for a file doesn't alter the one
+    returned by the next call on the same file
+    """
+    path = os.path.join(files_dir, "rpc_IKONOS.txt")
+    d = read_rpc_file(path)
+    expected = dict(d)
+
+    d['LINE_OFF'] = 'modified'
+    del d['SAMP_OFF']
+    assert read_rpc_file(path) == expected
 
-@pytest.mark.parametrize("filepath", supported_files())
-def test_successful_rpc_file_parsing(filepath):
+
+def test_rpc_file_cache_invalidation(tmp_path, rewriting):
     """
-    Check that filepath can be parsed without errors being raised
+    Check that a file is parsed again when it is rewritten
     """
-    rpc_from_rpc_file(filepath)
+    path = str(tmp_path / "rpc.txt")
+    shutil.copyfile(os.path.join(files_dir, "rpc_IKONOS.txt"), path)
+    assert read_rpc_file(path)['LINE_OFF'] == '+005124.00'
+
+    # same size, other content
+    with open(path, 'rb') as f:
+        content = f.read()
+    with rewriting(path), open(path, 'wb') as f:
+        f.write(content.replace(b'LINE_OFF: +005124.00', b'LINE_OFF: +004321.00'))
 
+    assert read_rpc_file(path)['LINE_OFF'] == '+004321.00'
 
-@pytest.mark.parametrize("filepath", unsupported_files())
-def test_failing_rpc_file_parsing(filepath):
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n", b"\r"])
+@pytest.mark.parametrize("non_ascii", [False, True])
+def test_ikonos_file_variants(tmp_path, newline, non_ascii):
     """
-    Check that filepath raises an error when being parsed
+    Check that the line endings and the non-ASCII characters of the keys
+    don't change the dict parsed from an ikonos file
     """
-    with pytest.raises(NotImplementedError):
-        rpc_from_rpc_file(filepath)
+    with open(os.path.join(files_dir, "rpc_IKONOS.txt"), 'rb') as f:
+        lines = f.read().splitlines()
+    expected = read_rpc_file(os.path.join(files_dir, "rpc_IKONOS.txt"))
+
+    if non_ascii:
+        # non-ASCII characters are dropped from the keys, as punctuation is
+        lines = [l.replace(b"_", "_\u00b0".encode(), 1).replace(b":", "\u00e9:".encode(), 1)
+                 for l in lines]
+        assert b"LINE_\xc2\xb0OFF\xc3\xa9:" in lines[0]
+
+    path = str(tmp_path / "rpc.txt")
+    with open(path, 'wb') as f:
+        f.write(newline.join(lines) + newline)
+
+    assert read_rpc_file(path) == expected
@@ -0,0 +1,209 @@
+import os
+
+import numpy as np
+import pytest
+
+from rpcm import geo
+from rpcm import rpc_from_rpc_file
+from rpcm import utils
+from rpcm.rpc_model import apply_rfm, apply_rfms, normalize
+
+here = os.path.abspath(os.path.dirname(__file__))
+files_dir = os.path.join(here, "test_rpc_files")
+
+# models with (PLEIADES) and without (WV3) localization polynoms
+filenames = ["rpc_PLEIADES.xml", "rpc_WV3.xml"]
+
+
+def sample_points(rpc):
+    """
+    Return a few 3D points spread over the validity domain of an RPC model.
+    """
+    lon = rpc.lon_offset + rpc.lon_scale * np.array([-0.5, 0, 0.5, 0.2])
+    lat = rpc.lat_offset + rpc.lat_scale * np.array([0.3, 0, -0.4, 0.6])
+    alt = rpc.alt_offset + np.array([0, 10, 50, -20])
+    return lon, lat, alt
+
+
+def reference_poly(c, x, y, z):
+    """
+    Explicit evaluation of the 20 terms of an RPC polynom, with x the
+    latitude (P), y the longitude (L) and z the altitude (H).
+    """
+    return (c[0] + c[1]*y + c[2]*x + c[3]*z + c[4]*y*x + c[5]*y*z + c[6]*x*z
+            + c[7]*y*y + c[8]*x*x + c[9]*z*z + c[10]*x*y*z + c[11]*y*y*y
+            + c[12]*y*x*x + c[13]*y*z*z + c[14]*y*y*x + c[15]*x*x*x
+            + c[16]*x*z*z + c[17]*y*y*z + c[18]*x*x*z + c[19]*z*z*z)
+
+
+def input_points():
+    """
+    Normalized 3D points given as scalars, 1D arrays, 1D arrays at constant
+    altitude, and 2D arrays at variable and constant altitude.
+    """
+    rng = np.random.default_rng(0)
+    x, y, z = rng.uniform(-0.9, 0.9, (3, 3, 4))
+    return [(x[0, 0], y[0, 0], z[0, 0]),
+            (x[0], y[0], z[0]),
+            (x[0], y[0], z[0, 0]),
+            (x, y, z),
+            (x, y, z[0, 0])]
+
+
+@pytest.mark.parametrize("points", input_points())
+def test_apply_rfms(points):
+    """
+    Check the evaluation paths of apply_rfms (single point, variable
+    altitude, constant altitude) against the explicit polynom expansion.
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, "rpc_WV3.xml"))
+    polys = [rpc.col_num, rpc.col_den, rpc.row_num, rpc.row_den]
+    x, y, z = points
+
+    expected = [reference_poly(n, x, y, z) / reference_poly(d, x, y, z)
+                for n, d in zip(polys[0::2], polys[1::2])]
+
+    col, row = apply_rfms(polys, x, y, z)
+    assert np.shape(col) == np.shape(row) == np.shape(x)
+    np.testing.assert_allclose([col, row], expected, rtol=1e-12, atol=1e-13)
+    np.testing.assert_allclose(apply_rfm(rpc.row_num, rpc.row_den, x, y, z),
+                               expected[1], rtol=1e-12, atol=1e-13)
+
+
+@pytest.mark.parametrize("x, y, z", [(0.5, -0.25, 0.1), (0, 0, 0)])
+def test_apply_rfms_zero_denominator(x, y, z):
+    """
+    A zero denominator gives inf (or nan if the numerator is zero too), with
+    numpy float64 results for single points as for arrays.
+    """
+    polys = [[1] + [0] * 19, [0] * 20, [0] * 20, [0] * 20]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rfms = apply_rfms(polys, x, y, z)
+        expected = apply_rfms(polys, np.array([x]), np.array([y]), np.array([z]))
+
+    assert all(isinstance(v, np.float64) for v in rfms)
+    assert np.isposinf(rfms[0]) and np.isnan(rfms[1])
+    np.testing.assert_array_equal(np.ravel(rfms), np.ravel(expected))
+
+
+@pytest.mark.parametrize("filename", filenames)
+def test_projection_localization_scalar_types(filename):
+    """
+    Single points given as Python floats give numpy float64 coordinates, as
+    single points given as 0-d arrays do.
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, filename))
+    lon, lat, alt = rpc.lon_offset, rpc.lat_offset, rpc.alt_offset
+
+    col, row = rpc.projection(lon, lat, alt)
+    col0, row0 = rpc.projection(np.array(lon), np.array(lat), np.array(alt))
+    assert type(col) is type(row) is type(col0) is type(row0) is np.float64
+
+    lon1, lat1 = rpc.localization(float(col), float(row), alt)
+    assert type(lon1) is type(lat1) is np.float64
+
+
+def test_normalize_scalar_array():
+    """
+    Scalars and arrays are normalized with the same formula: a coordinate
+    gives the same bits either way.
+    """
+    rng = np.random.default_rng(0)
+    a = rng.uniform(-1e4, 1e4, 1000)
+    offset, scale = 1234.5, 3.7
+
+    expected = normalize(a, offset, scale)
+    np.testing.assert_array_equal([normalize(float(v), offset, scale) for v in a],
+                                  expected)
+
+
+@pytest.mark.parametrize("filename", filenames)
+@pytest.mark.parametrize("points", input_points())
+def test_projection_localization_round_trip(filename, points):
+    """
+    Check that localizing projected points gives back the input points, with
+    the direct (PLEIADES) and the iterative (WV3) localization.
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, filename))
+    x, y, z = points
+    lon = rpc.lon_offset + rpc.lon_scale * y
+    lat = rpc.lat_offset + rpc.lat_scale * x
+    alt = rpc.alt_offset + rpc.alt_scale * 0.5 * z
+
+    col, row = rpc.projection(lon, lat, alt)
+    assert np.shape(col) == np.shape(row) == np.shape(lon)
+
+    lon2, lat2 = rpc.localization(col, row, alt)
+    assert np.shape(lon2) == np.shape(lat2) == np.shape(lon)
+    np.testing.assert_allclose([lon2, lat2], [lon, lat], rtol=0, atol=1e-7)
+
+
+@pytest.mark.parametrize("filename", filenames)
+def test_projection_jacobian(filename):
+    """
+    Check the derivatives of the projection function against central finite
+    differences.
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, filename))
+    lon, lat, alt = sample_points(rpc)
+
+    steps = [1e-6, 1e-6, 1e-2]  # degrees, degrees, meters
+    expected = np.empty((2, 3) + lon.shape)
+    for k, h in enumerate(steps):
+        p, m = [lon, lat, alt], [lon, lat, alt]
+        p[k] = p[k] + h
+        m[k] = m[k] - h
+        expected[:, k] = (np.array(rpc.projection(*p)) - np.array(rpc.projection(*m))) / (2 * h)
+
+    jacobian = rpc.projection_jacobian(lon, lat, alt)
+    assert jacobian.shape == (2, 3) + lon.shape
+    np.testing.assert_allclose(jacobian, expected, rtol=1e-5, atol=1e-6)
+
+
+def incidence_angles_by_localization(rpc, lon, lat, z):
+    """
+    Reference computation of the incidence angles, from the localization of
+    the projected point at two altitudes 100 meters apart.
+    """
+    col, row = rpc.projection(lon, lat, z)
+    lon0, lat0 = rpc.localization(col, row, z)
+    lon1, lat1 = rpc.localization(col, row, np.add(z, 100))
+
+    transformer = geo.lonlat_to_epsg_transformer(int(np.ravel(geo.compute_epsg(lon, lat))[0]))
+    x0, y0 = transformer.transform(lon0, lat0)
+    x1, y1 = transformer.transform(lon1, lat1)
+    d = np.array([np.subtract(x1, x0), np.subtract(y1, y0), np.full(np.shape(x0), 100.)])
+    d /= np.linalg.norm(d, axis=0)
+
+    zenith = np.degrees(np.arccos(d[2]))
+    azimuth = np.degrees(np.arctan2(d[0], d[1]))
+    return zenith, azimuth
+
+
+@pytest.mark.parametrize("filename", filenames)
+def test_incidence_angles(filename):
+    """
+    Compare the incidence angles to the ones given by localizing the point
+    at two altitudes, on arrays and single points.
+    """
+    rpc = rpc_from_rpc_file(os.path.join(files_dir, filename))
+    lon, lat, alt = sample_points(rpc)
+
+    zenith, azimuth = rpc.incidence_angles(lon, lat, alt)
+    assert np.shape(zenith) == np.shape(azimuth) == lon.shape
+
+    expected_zenith, expected_azimuth = incidence_angles_by_localization(rpc, lon, lat, alt)
+    np.testing.assert_allclose(zenith, expected_zenith, atol=1e-2)
+
+    # the azimuth is ill-conditioned close to the nadir: compare the viewing
+    # directions instead
+    a = np.array(utils.viewing_direction(zenith, azimuth))
+    b = np.array(utils.viewing_direction(expected_zenith, expected_azimuth))
+    np.testing.assert_allclose(a, b, atol=1e-4)
+
+    # single points give floats, equal to the array results
+    for i in range(lon.size):
+        z, a = rpc.incidence_angles(lon[i], lat[i], alt[i])
+        assert np.ndim(z) == np.ndim(a) == 0
+        np.testing.assert_allclose([z, a], [zenith[i], azimuth[i]])
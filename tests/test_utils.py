@@ -0,0 +1,21 @@
+import numpy as np
+
+from rpcm import utils
+
+
+def test_points_apply_homography():
+    """
+    Test that applying an homography to a list of 2D points gives the same
+    result as applying it to each point in homogeneous coordinates.
+    """
+    H = np.array([[1.1, 0.1, 5],
+                  [0.05, 0.9, -3],
+                  [1e-5, 2e-5, 1]])
+    pts = [(100, 200), (300, 50), (0, 0)]
+
+    expected = []
+    for x, y in pts:
+        p = H @ [x, y, 1]
+        expected.append(p[:2] / p[2])
+
+    np.testing.assert_allclose(utils.points_apply_homography(H, pts), expected)